@@ -11,16 +11,26 @@ COOLIFY_API_KEY="your-api-key"
 COOLIFY_PROJECT_ID="your-project-id"
 MEMORY_LIMIT="2048m"
 CPU_LIMIT="1.0"
+VM_CPU_PERIOD_US="10000"   # CFS period for the CPU limit; shorter periods shorten throttling stalls
+VM_CPU_PINNING="false"     # Pin each VM to dedicated CPUs, assigned round-robin
 COMMAND_TIMEOUT="3600"
+VM_START_PERIOD="30"       # Seconds to wait for a new VM's API to report healthy
+VM_MAX_READ_BYTES="8388608"  # Largest file read_file will return
+MAX_OUTPUT_BYTES="8388608"   # Command output kept in the "cli" and "docker" exec modes
 VM_PORT="8080"              # Port the VM API will listen on
 HOST_PORT="8081"           # Port exposed on the host machine
+VM_BASE_IMAGE="openwebui-vm:latest"  # Image built from the repository Dockerfile
+VM_FAST_MODE="false"       # Run VMs without seccomp/AppArmor confinement
+VM_EXEC_MODE="api"         # "api" (HTTP to the VM API), "cli" (docker exec) or "docker" (docker-py exec_run)
+VM_WORKSPACE_TMPFS=""      # Size of a RAM-backed /workspace (e.g. "256m"); empty keeps it on disk
+VM_WORKSPACE_HOST_DIR=""   # Host directory bind-mounted as /workspace (one subdirectory per session)
 
 ## Setup Instructions
 
 ### Prerequisites:
 1. Docker installed and running
 2. Coolify server set up and accessible
-3. Python 3.8+ with docker-py package installed
+3. Python 3.8+ with docker-py package installed (orjson optional, for faster JSON handling)
 
 ### Coolify Configuration:
 1. Ensure Coolify API access is configured
@@ -34,19 +44,49 @@ HOST_PORT="8081"           # Port exposed on the host machine
 ### Security Considerations:
 - All VMs run in network isolation mode by default
 - File operations are restricted to /workspace directory
-- Command execution is limited to the allowed_commands list
+- Command execution is limited to the allowed_commands list; every command in a
+  chain is checked, but substitutions in double quotes or backticks are not
 - Resources are constrained by memory and CPU limits
+- VM_FAST_MODE drops the seccomp/AppArmor profiles; only enable it for trusted workloads
 - All containers are automatically removed when stopped
 """
 
 import os
+import re
 import json
+import codecs
+import math
+import uuid
+import itertools
+import shlex
+import stat
+import subprocess
+import atexit
+import asyncio
+import threading
 import logging
 import requests
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Any, Tuple
 import docker
 import time
 from functools import lru_cache
+from dataclasses import dataclass
+
+# orjson is optional; it decodes large command outputs and file contents much faster
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_OCTET_STREAM_HEADERS = {"Content-Type": "application/octet-stream"}
+_STREAM_CHUNK_SIZE = 64 * 1024
 
 # Configure logging
 logging.basicConfig(
@@ -56,57 +96,357 @@ logging.basicConfig(
 )
 logger = logging.getLogger("OpenWebUI-VM-Controller")
 
-@lru_cache(maxsize=1)
-def get_config() -> Dict[str, Any]:
-    """Get configuration from environment variables."""
-    # Load configuration from environment variables
-    # In production, these should be set in the .env file which is not committed to version control
-    return {
-        'coolify_url': os.getenv('COOLIFY_URL'),
-        'coolify_api_key': os.getenv('COOLIFY_API_KEY'),
-        'coolify_project_id': os.getenv('COOLIFY_PROJECT_ID'),
-        'memory_limit': os.getenv('MEMORY_LIMIT', '2048m'),
-        'cpu_limit': float(os.getenv('CPU_LIMIT', '1.0')),
-        'timeout': int(os.getenv('COMMAND_TIMEOUT', '3600')),
-        'vm_port': int(os.getenv('VM_PORT', '8080')),
-        'host_port': int(os.getenv('HOST_PORT', '8081')),
-        'repo_url': os.getenv('REPO_URL', 'https://github.com/amintt2/OpenWebui.git'),
-        'repo_branch': os.getenv('REPO_BRANCH', 'main')
-    }
+@dataclass(frozen=True)
+class Config:
+    """Controller configuration, read from environment variables once at import."""
+    coolify_url: Optional[str]
+    coolify_api_key: Optional[str]
+    coolify_project_id: Optional[str]
+    base_image: str
+    memory_limit: str
+    cpu_limit: float
+    cpu_period: int
+    cpu_pinning: bool
+    timeout: int
+    start_period: float
+    max_read_bytes: int
+    max_output_bytes: int
+    vm_port: int
+    host_port: int
+    fast_mode: bool
+    exec_mode: str
+    workspace_tmpfs: str
+    workspace_host_dir: str
+    repo_url: str
+    repo_branch: str
 
-def tool_specification():
-    """OpenWebUI tool specification"""
-    return {
-        "name": "ubuntu-vm",
-        "description": "Provides access to a sandboxed Ubuntu VM for executing commands and running code",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "action": {
-                    "type": "string",
-                    "enum": ["start", "stop", "execute", "write_file", "read_file", "install"],
-                    "description": "Action to perform in the VM"
-                },
-                "command": {
-                    "type": "string",
-                    "description": "Command to execute (for 'execute' action)"
-                },
-                "file_path": {
-                    "type": "string",
-                    "description": "Path to file (for file operations)"
-                },
-                "content": {
-                    "type": "string",
-                    "description": "Content to write (for 'write_file' action)"
-                },
-                "package": {
-                    "type": "string",
-                    "description": "Package name to install (for 'install' action)"
-                }
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Build the configuration from environment variables."""
+        # In production, these should be set in the .env file which is not committed to version control
+        return cls(
+            coolify_url=os.getenv('COOLIFY_URL'),
+            coolify_api_key=os.getenv('COOLIFY_API_KEY'),
+            coolify_project_id=os.getenv('COOLIFY_PROJECT_ID'),
+            base_image=os.getenv('VM_BASE_IMAGE', 'openwebui-vm:latest'),
+            memory_limit=os.getenv('MEMORY_LIMIT', '2048m'),
+            cpu_limit=float(os.getenv('CPU_LIMIT', '1.0')),
+            cpu_period=int(os.getenv('VM_CPU_PERIOD_US', '10000')),
+            cpu_pinning=os.getenv('VM_CPU_PINNING', 'false').lower() == 'true',
+            timeout=int(os.getenv('COMMAND_TIMEOUT', '3600')),
+            start_period=float(os.getenv('VM_START_PERIOD', '30')),
+            max_read_bytes=int(os.getenv('VM_MAX_READ_BYTES', str(8 * 1024 * 1024))),
+            max_output_bytes=int(os.getenv('MAX_OUTPUT_BYTES', str(8 * 1024 * 1024))),
+            vm_port=int(os.getenv('VM_PORT', '8080')),
+            host_port=int(os.getenv('HOST_PORT', '8081')),
+            fast_mode=os.getenv('VM_FAST_MODE', 'false').lower() == 'true',
+            exec_mode=os.getenv('VM_EXEC_MODE', 'api').lower(),
+            workspace_tmpfs=os.getenv('VM_WORKSPACE_TMPFS', ''),
+            workspace_host_dir=os.getenv('VM_WORKSPACE_HOST_DIR', ''),
+            repo_url=os.getenv('REPO_URL', 'https://github.com/amintt2/OpenWebui.git'),
+            repo_branch=os.getenv('REPO_BRANCH', 'main')
+        )
+
+CONFIG = Config.from_env()
+
+def get_config() -> Config:
+    """Get the configuration loaded from environment variables."""
+    return CONFIG
+
+# A single Docker client is shared by every controller in the process
+_docker_client: Optional[docker.DockerClient] = None
+_docker_client_lock = threading.Lock()
+
+def _get_docker_client() -> docker.DockerClient:
+    """Return the process-wide Docker client, creating it on first use."""
+    global _docker_client
+    with _docker_client_lock:
+        if _docker_client is None:
+            _docker_client = docker.from_env()
+            logger.info("Docker client initialized successfully")
+        return _docker_client
+
+# Recently looked-up containers by name, so repeated lookups skip the daemon
+_CONTAINER_CACHE_TTL = 5.0
+_container_cache: Dict[str, Tuple[Any, float]] = {}
+_container_cache_lock = threading.Lock()
+
+def _get_container(client: docker.DockerClient, name: str, ttl: float = _CONTAINER_CACHE_TTL):
+    """
+    Return a container by name, reusing a lookup made within the last `ttl` seconds.
+    
+    Raises:
+        docker.errors.NotFound: If no container has that name
+    """
+    now = time.monotonic()
+    with _container_cache_lock:
+        cached = _container_cache.get(name)
+        if cached is not None and now - cached[1] < ttl:
+            return cached[0]
+    try:
+        container = client.containers.get(name)
+    except docker.errors.NotFound:
+        _invalidate_container(name)
+        raise
+    _cache_container(name, container)
+    return container
+
+def _cache_container(name: str, container) -> None:
+    with _container_cache_lock:
+        _container_cache[name] = (container, time.monotonic())
+
+def _invalidate_container(name: str) -> None:
+    with _container_cache_lock:
+        _container_cache.pop(name, None)
+
+# A single pooled HTTP session is shared by every controller in the process,
+# so calls to the VM API reuse keep-alive connections instead of reconnecting
+_CONNECT_TIMEOUT = 1
+# Extra read time past COMMAND_TIMEOUT, so the VM API's own 504 arrives first
+_READ_TIMEOUT_MARGIN = 10
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+def _get_http_session() -> requests.Session:
+    """Return the process-wide pooled requests session, creating it on first use."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=16,
+                # Refused connections are not retried: the health wait polls on its own schedule
+                max_retries=Retry(total=2, connect=0, backoff_factor=0.1)
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+def _error_detail(response: requests.Response) -> str:
+    """Return the detail message of a VM API error response."""
+    try:
+        return _loads(response.content).get("detail", response.reason)
+    except ValueError:
+        return response.reason
+
+def _wait_for_health(session: requests.Session, url: str, start_period: float = 30.0) -> bool:
+    """
+    Poll a health endpoint with exponential backoff until it answers 200.
+    
+    Polling starts at 50ms and doubles up to 2s between attempts, so fast
+    boots are noticed almost immediately while slow hosts get the whole
+    start period.
+    
+    Args:
+        session: HTTP session to poll with
+        url: Health endpoint URL
+        start_period: Maximum time to wait, in seconds
+        
+    Returns:
+        True if the endpoint became healthy within the start period
+    """
+    deadline = time.monotonic() + start_period
+    delay = 0.05
+    while True:
+        try:
+            if session.get(url, timeout=0.5).status_code == 200:
+                return True
+        except (requests.ConnectionError, requests.Timeout):
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 2.0)
+
+# Images already confirmed present locally, so start_vm never pulls twice
+_ensured_images: set = set()
+_ensured_images_lock = threading.Lock()
+
+def _ensure_image(client: docker.DockerClient, image: str) -> None:
+    """Pull an image once per process, and only if it is not already present."""
+    with _ensured_images_lock:
+        if image in _ensured_images:
+            return
+        if not client.images.list(name=image):
+            logger.info(f"Pulling image {image}")
+            client.images.pull(image)
+        _ensured_images.add(image)
+
+# Smallest CFS quota the Docker daemon accepts, in microseconds
+_MIN_CPU_QUOTA = 1000
+
+# CPUs handed out round-robin when VMs are pinned
+_cpu_cycle: Optional[itertools.cycle] = None
+_cpu_count = 0
+_cpu_cycle_lock = threading.Lock()
+
+def _next_cpuset(count: int) -> str:
+    """Return the next `count` CPUs available to this process as a cpuset string."""
+    global _cpu_cycle, _cpu_count
+    with _cpu_cycle_lock:
+        if _cpu_cycle is None:
+            if hasattr(os, "sched_getaffinity"):
+                cpus = sorted(os.sched_getaffinity(0))
+            else:
+                cpus = list(range(os.cpu_count() or 1))
+            _cpu_cycle = itertools.cycle(cpus)
+            _cpu_count = len(cpus)
+        return ",".join(str(next(_cpu_cycle)) for _ in range(min(count, _cpu_count)))
+
+# Package names, optionally pinned to an exact version (e.g. "numpy==1.26.4")
+_PACKAGE_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._\-]*(?:==[A-Za-z0-9._\-]+)?")
+
+# Session ids name the container and the host workspace directory, so they are
+# limited to characters valid in both and may not be "." or ".."
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_.\-]+")
+
+def _valid_session_id(session_id: Any) -> bool:
+    """Whether a session id is safe to use in container names and host paths."""
+    return (isinstance(session_id, str) and session_id not in (".", "..")
+            and _SESSION_ID_RE.fullmatch(session_id) is not None)
+
+# Read-only commands whose output may be reused for a short time; a command is
+# only cached when it contains no shell syntax (redirects, pipes, expansions)
+_READ_ONLY_COMMANDS = frozenset({"ls", "cat", "echo"})
+_SHELL_METACHARS = frozenset("|&;<>()$`\\\"'*?[]{}~#=!\n")
+_EXEC_CACHE_TTL = 2.0
+
+# Seconds a timed-out command gets to exit on SIGTERM before it is killed
+_KILL_GRACE = 5
+
+# Shell operators after which a new simple command begins
+_COMMAND_SEPARATORS = frozenset("();|&\n")
+
+def _decode_capped(chunks, limit: int) -> str:
+    """
+    Decode streamed output chunks incrementally, keeping at most `limit` bytes.
+    
+    The stream is drained to the end past the cap so the producer never
+    blocks on a full pipe.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    remaining = limit
+    truncated = False
+    for chunk in chunks:
+        kept = chunk[:remaining]
+        if kept:
+            remaining -= len(kept)
+            parts.append(decoder.decode(kept))
+        if len(kept) < len(chunk):
+            truncated = True
+    parts.append(decoder.decode(b"", final=True))
+    if truncated:
+        parts.append("\n[output truncated]")
+    return "".join(parts)
+
+@lru_cache(maxsize=256)
+def _command_bases(command: str) -> Tuple[str, ...]:
+    """
+    Return the program name of every simple command in a command line.
+    
+    Commands chained with ;, &&, ||, |, & or newlines and those opened by a
+    subshell or $( ) are all included. This is a tokenizer rather than a shell
+    parser: substitutions inside double quotes or backticks are not inspected.
+    Unparseable input yields ("",) so it never matches an allow-list.
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars="();<>|&\n")
+    lexer.whitespace = " \t\r"
+    lexer.whitespace_split = True
+    # shlex would drop everything after a "#" even mid-word, where the shell
+    # does not; keeping comments as words can only make the check stricter
+    lexer.commenters = ""
+    bases = []
+    at_start = True
+    try:
+        for token in lexer:
+            if token and set(token) <= _COMMAND_SEPARATORS:
+                at_start = True
+            elif at_start:
+                bases.append(os.path.basename(token))
+                at_start = False
+    except ValueError:
+        return ("",)
+    return tuple(bases) or ("",)
+
+# Builtins have no executable to exec directly, so they always need a shell
+_SHELL_BUILTINS = frozenset({
+    "cd", "export", "unset", "set", "source", ".", "alias", "unalias", "exec",
+    "eval", "exit", "read", "ulimit", "umask", "wait", "command", "type", "hash",
+    "trap", "getopts", "readonly", "local", "shift", "return", "break",
+    "continue", ":", "times", "let", "declare", "typeset", "builtin", "jobs",
+    "bg", "fg", "disown", "shopt", "pushd", "popd", "dirs"
+})
+
+# Tool parameter name -> VM API field name, per action accepted in a batch
+_BATCH_FIELDS = {
+    "execute": {"command": "command"},
+    "write_file": {"file_path": "path", "content": "content"},
+    "read_file": {"file_path": "path"},
+    "install": {"package": "package"},
+}
+
+# Base commands the VM accepts when no explicit allow-list is given
+DEFAULT_ALLOWED_COMMANDS = (
+    "ls", "cat", "echo", "python", "python3", "pip", "pip3", "apt-get", "apt", 
+    "cd", "mkdir", "rm", "cp", "mv", "chmod", "touch", "date", 
+    "grep", "find", "curl", "wget", "git"
+)
+
+# The specification never changes, so it is built once and shared by every caller
+_TOOL_SPEC = {
+    "name": "ubuntu-vm",
+    "description": "Provides access to a sandboxed Ubuntu VM for executing commands and running code",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "action": {
+                "type": "string",
+                "enum": ["start", "stop", "execute", "execute_batch", "write_file", "read_file", "install", "batch"],
+                "description": "Action to perform in the VM"
             },
-            "required": ["action"]
-        }
+            "command": {
+                "type": "string",
+                "description": "Command to execute (for 'execute' action)"
+            },
+            "commands": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Commands to run in order, stopping at the first failure (for 'execute_batch' action)"
+            },
+            "file_path": {
+                "type": "string",
+                "description": "Path to file (for file operations)"
+            },
+            "content": {
+                "type": "string",
+                "description": "Content to write (for 'write_file' action)"
+            },
+            "package": {
+                "type": "string",
+                "description": "Package name to install (for 'install' action)"
+            },
+            "ops": {
+                "type": "array",
+                "items": {"type": "object"},
+                "description": "Operations to run in one round-trip, each with an 'action' of execute, write_file, read_file or install plus that action's parameters (for 'batch' action)"
+            }
+        },
+        "required": ["action"]
     }
+}
+
+def tool_specification() -> Dict[str, Any]:
+    """
+    OpenWebUI tool specification.
+    
+    The same dict is returned on every call and must be treated as
+    read-only; it is JSON-serializable as is. Copy it before modifying.
+    """
+    return _TOOL_SPEC
 
 class VMController:
     """
@@ -115,12 +455,14 @@ class VMController:
     """
     
     def __init__(self, 
-                 base_image: str = "ubuntu:22.04", 
+                 base_image: Optional[str] = None, 
                  memory_limit: Optional[str] = None,
                  cpu_limit: Optional[float] = None,
                  timeout_seconds: Optional[int] = None,
                  allowed_commands: Optional[List[str]] = None,
-                 session_id: Optional[str] = None):
+                 session_id: Optional[str] = None,
+                 fast_mode: Optional[bool] = None,
+                 exec_mode: Optional[str] = None):
         """
         Initialize the VM controller with configurable constraints.
         
@@ -131,35 +473,74 @@ class VMController:
             timeout_seconds: Maximum execution time before termination
             allowed_commands: List of commands that are allowed to be executed
             session_id: Unique session identifier
+            fast_mode: Disable seccomp/AppArmor profiles to cut per-syscall overhead
+            exec_mode: "api" to run commands through the VM API, "cli" to use local
+                docker exec, "docker" to use docker-py exec_run
         """
-        # Get configuration from environment
-        config = get_config()
-        
-        self.base_image = base_image
-        self.memory_limit = memory_limit or config['memory_limit']
-        self.cpu_limit = cpu_limit or config['cpu_limit']
-        self.timeout_seconds = timeout_seconds or config['timeout']
-        self.allowed_commands = allowed_commands or [
-            "ls", "cat", "echo", "python", "pip", "apt-get", "apt", 
-            "cd", "mkdir", "rm", "cp", "mv", "chmod", "touch", "date", 
-            "grep", "find", "curl", "wget", "git"
-        ]
+        self.base_image = base_image or CONFIG.base_image
+        self.memory_limit = memory_limit or CONFIG.memory_limit
+        self.cpu_limit = cpu_limit or CONFIG.cpu_limit
+        self.cpu_period = CONFIG.cpu_period
+        self.cpu_pinning = CONFIG.cpu_pinning
+        self.timeout_seconds = timeout_seconds or CONFIG.timeout
+        self.start_period = CONFIG.start_period
+        self.max_read_bytes = CONFIG.max_read_bytes
+        self.max_output_bytes = CONFIG.max_output_bytes
+        self.fast_mode = CONFIG.fast_mode if fast_mode is None else fast_mode
+        self.exec_mode = exec_mode or CONFIG.exec_mode
+        self.workspace_tmpfs = CONFIG.workspace_tmpfs
+        # Only the base command is ever checked, so store a hashed set of those
+        self.allowed_commands = frozenset(
+            command.split()[0] for command in (allowed_commands or DEFAULT_ALLOWED_COMMANDS)
+        )
         
         # Coolify configuration
-        self.coolify_url = config['coolify_url']
-        self.coolify_api_key = config['coolify_api_key']
-        self.coolify_project_id = config['coolify_project_id']
-        self.vm_port = config['vm_port']
-        self.host_port = config['host_port']
+        self.coolify_url = CONFIG.coolify_url
+        self.coolify_api_key = CONFIG.coolify_api_key
+        self.coolify_project_id = CONFIG.coolify_project_id
+        self.vm_port = CONFIG.vm_port
+        self.host_port = CONFIG.host_port
         
         # Session management
         self.session_id = session_id or os.getenv('OPENWEBUI_SESSION_ID', 'default')
+        if not _valid_session_id(self.session_id):
+            raise ValueError(f"Invalid session id: {self.session_id!r}")
         self.container_name = f"openwebui-vm-{self.session_id}"
         
-        # Initialize Docker client
+        # Host side of a bind-mounted /workspace, used for direct file access
+        self.workspace_host = None
+        if CONFIG.workspace_host_dir:
+            self.workspace_host = os.path.abspath(os.path.join(CONFIG.workspace_host_dir, self.session_id))
+        
+        # Container settings are fixed once the controller is configured, so
+        # they are built here once rather than on every start
+        self._create_kwargs = {
+            "mem_limit": self.memory_limit,
+            # An explicit short CFS period keeps quota stalls short for bursty commands
+            "cpu_period": self.cpu_period,
+            # Docker rejects quotas under 1ms, so very small limits are clamped up to it
+            "cpu_quota": max(int(float(self.cpu_limit) * self.cpu_period), _MIN_CPU_QUOTA),
+            "ports": {f"{self.vm_port}/tcp": self.host_port},
+            # The VM API enforces the same command timeout the controller waits for
+            "environment": {"COMMAND_TIMEOUT": str(self.timeout_seconds)},
+            "name": self.container_name,
+            # Syscall filtering dominates exec latency for syscall-heavy commands
+            "security_opt": ["seccomp=unconfined", "apparmor=unconfined"] if self.fast_mode else None,
+            # A tmpfs workspace skips overlayfs copy-on-write for every file the LLM touches
+            "tmpfs": {"/workspace": f"rw,size={self.workspace_tmpfs},mode=1777"}
+                     if self.workspace_tmpfs and not self.workspace_host else None,
+            "volumes": {self.workspace_host: {"bind": "/workspace", "mode": "rw"}}
+                       if self.workspace_host else None,
+            "labels": {
+                "managed-by": "coolify",
+                "project": self.coolify_project_id,
+                "openwebui-vm": "true"
+            },
+        }
+        
+        # Reuse the shared Docker client
         try:
-            self.docker_client = docker.from_env()
-            logger.info(f"Docker client initialized successfully")
+            self.docker_client = _get_docker_client()
         except Exception as e:
             logger.error(f"Failed to initialize Docker client: {e}")
             raise
@@ -168,8 +549,14 @@ class VMController:
         self.container = None
         self.container_id = None
         
-        # API endpoint
+        # Recent read-only command results: command -> (timestamp, result)
+        self._exec_cache: Dict[str, Any] = {}
+        
+        # API endpoint, reached over the shared connection pool; connecting
+        # fails fast while slow commands get the full timeout to answer
         self.vm_api_url = f"http://localhost:{self.host_port}/api/v1"
+        self._session = _get_http_session()
+        self._timeout = (_CONNECT_TIMEOUT, self.timeout_seconds + _READ_TIMEOUT_MARGIN)
 
     def start_vm(self) -> Dict[str, Any]:
         """
@@ -178,10 +565,12 @@ class VMController:
         Returns:
             Dict containing status and container information
         """
+        self._exec_cache.clear()
+        
         try:
             # Check if container already exists
             try:
-                existing = self.docker_client.containers.get(self.container_name)
+                existing = _get_container(self.docker_client, self.container_name)
                 logger.info(f"Container {self.container_name} already exists, reusing")
                 self.container = existing
                 self.container_id = existing.id
@@ -193,32 +582,32 @@ class VMController:
             except docker.errors.NotFound:
                 pass
                 
-            # Create and start the container
-            self.container = self.docker_client.containers.run(
+            if self.workspace_host:
+                os.makedirs(self.workspace_host, exist_ok=True)
+                os.chmod(self.workspace_host, 0o1777)
+            
+            # Make sure the image is local before creating the container
+            _ensure_image(self.docker_client, self.base_image)
+            
+            # Create and start the container; only the CPU set varies between starts
+            self.container = self.docker_client.containers.create(
                 self.base_image,
-                detach=True,
-                mem_limit=self.memory_limit,
-                nano_cpus=int(float(self.cpu_limit) * 1e9),
-                ports={f"{self.vm_port}/tcp": self.host_port},
-                name=self.container_name,
-                labels={
-                    "managed-by": "coolify",
-                    "project": self.coolify_project_id,
-                    "openwebui-vm": "true"
-                }
+                cpuset_cpus=_next_cpuset(math.ceil(float(self.cpu_limit))) if self.cpu_pinning else None,
+                **self._create_kwargs
             )
+            self.container.start()
             
             self.container_id = self.container.id
+            _cache_container(self.container_name, self.container)
             logger.info(f"VM started with container ID: {self.container_id}")
             
             # Wait for API to be ready
-            for _ in range(10):
-                try:
-                    response = requests.get(f"{self.vm_api_url}/health")
-                    if response.status_code == 200:
-                        break
-                except:
-                    time.sleep(1)
+            if not _wait_for_health(self._session, f"{self.vm_api_url}/health", self.start_period):
+                return {
+                    "status": "error",
+                    "container_id": self.container_id,
+                    "message": f"VM API did not become healthy within {self.start_period:g}s"
+                }
             
             return {
                 "status": "success",
@@ -240,21 +629,24 @@ class VMController:
         Returns:
             Dict containing status and message
         """
+        self._exec_cache.clear()
+        
         try:
             # Send shutdown signal to API first
             try:
-                requests.post(f"{self.vm_api_url}/shutdown")
-            except:
+                self._session.post(f"{self.vm_api_url}/shutdown", timeout=_CONNECT_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout):
                 pass
                 
             # Get container if not already referenced
             if not self.container:
                 try:
-                    self.container = self.docker_client.containers.get(self.container_name)
+                    self.container = _get_container(self.docker_client, self.container_name)
                 except docker.errors.NotFound:
                     return {"status": "success", "message": "No VM is currently running"}
             
             self.container.stop()
+            _invalidate_container(self.container_name)
             logger.info(f"VM with container ID {self.container_id} stopped")
             self.container = None
             self.container_id = None
@@ -267,20 +659,86 @@ class VMController:
         """
         Execute a command in the VM and return the result.
         
+        Every simple command in the line must start with an allowed program;
+        see _command_bases for what the check does not cover.
+        
+        Args:
+            command: The command to execute
+            
+        Returns:
+            Dict containing status, output, and error information
+        """
+        # Rejected here, a disallowed command never costs a round-trip to the VM
+        base = self._disallowed_base(command)
+        if base is not None:
+            return {
+                "status": "error",
+                "message": f"Command '{base}' not allowed"
+            }
+        return self._run_command(command)
+
+    def _disallowed_base(self, command: str) -> Optional[str]:
+        """Return the first program in a command line that is not allowed, or None."""
+        for base in _command_bases(command):
+            if base not in self.allowed_commands:
+                return base
+        return None
+
+    def _run_command(self, command: str) -> Dict[str, Any]:
+        """
+        Run an already validated command, serving repeated read-only ones from cache.
+        
+        Args:
+            command: The command to execute
+            
+        Returns:
+            Dict containing status, output, and error information
+        """
+        cacheable = self._is_cacheable(command)
+        if cacheable:
+            cached = self._exec_cache.get(command)
+            if cached is not None and time.monotonic() - cached[0] < _EXEC_CACHE_TTL:
+                return dict(cached[1])
+        else:
+            # Anything not known to be read-only may change what cached commands see
+            self._exec_cache.clear()
+        
+        if self.exec_mode == "api":
+            result = self._execute_command_api(command)
+        else:
+            result = self._exec_direct(self._exec_argv(command))
+        
+        if cacheable and result["status"] == "success":
+            self._exec_cache[command] = (time.monotonic(), dict(result))
+        return result
+
+    @staticmethod
+    def _is_cacheable(command: str) -> bool:
+        """Whether a command is a plain read-only invocation whose output can be reused."""
+        parts = command.split()
+        return (bool(parts) and parts[0] in _READ_ONLY_COMMANDS
+                and not any(ch in _SHELL_METACHARS for ch in command))
+
+    def _execute_command_api(self, command: str) -> Dict[str, Any]:
+        """
+        Execute a command through the VM API.
+        
         Args:
             command: The command to execute
             
         Returns:
             Dict containing status, output, and error information
         """
-        # Send command to VM API
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.vm_api_url}/execute",
-                json={"command": command},
-                timeout=self.timeout_seconds
+                data=_dumps({"command": command}),
+                headers=_JSON_HEADERS,
+                timeout=self._timeout
             )
-            result = response.json()
+            if response.status_code != 200:
+                return {"status": "error", "message": _error_detail(response)}
+            result = _loads(response.content)
             return {
                 "status": "success",
                 "output": result.get("output", ""),
@@ -293,6 +751,182 @@ class VMController:
                 "message": f"Command execution failed: {str(e)}"
             }
 
+    @staticmethod
+    def _exec_argv(command: str) -> List[str]:
+        """Build the argv to exec for a command, using a shell only when it needs one."""
+        # Plain commands are exec'd as argv, saving a /bin/sh fork inside the VM
+        if not any(ch in _SHELL_METACHARS for ch in command):
+            argv = command.split()
+            if argv and argv[0] not in _SHELL_BUILTINS:
+                return argv
+        return ["sh", "-c", command]
+
+    def _bounded_argv(self, argv: List[str]) -> List[str]:
+        """Wrap argv in coreutils timeout so the VM itself kills it after timeout_seconds."""
+        return ["timeout", "-k", str(_KILL_GRACE), str(self.timeout_seconds), *argv]
+
+    def _exec_direct(self, argv: List[str]) -> Dict[str, Any]:
+        """
+        Execute argv in the container directly, skipping the VM API hop.
+        
+        Uses the local docker CLI in "cli" mode and docker-py's low-level exec
+        API in "docker" mode; stdout and stderr are merged as the VM API does.
+        Output is streamed and capped at max_output_bytes. The command runs
+        under timeout inside the container, so it is killed there after
+        timeout_seconds (exit code 124) rather than left running.
+        
+        Args:
+            argv: Program and arguments to execute in /workspace
+            
+        Returns:
+            Dict containing status, output, and error information
+        """
+        argv = self._bounded_argv(argv)
+        try:
+            if self.exec_mode == "cli":
+                process = subprocess.Popen(
+                    ["docker", "exec", "-w", "/workspace", self.container_name, *argv],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT
+                )
+                # Backstop only: the in-container timeout normally fires first
+                backstop = threading.Timer(self.timeout_seconds + 2 * _KILL_GRACE, process.kill)
+                backstop.start()
+                try:
+                    with process:
+                        output = _decode_capped(
+                            iter(lambda: process.stdout.read(_STREAM_CHUNK_SIZE), b""),
+                            self.max_output_bytes
+                        )
+                    exit_code = process.returncode
+                finally:
+                    backstop.cancel()
+            else:
+                if self.container is None:
+                    self.container = _get_container(self.docker_client, self.container_name)
+                    self.container_id = self.container.id
+                api = self.docker_client.api
+                exec_id = api.exec_create(self.container.id, argv, workdir="/workspace")["Id"]
+                output = _decode_capped(api.exec_start(exec_id, stream=True), self.max_output_bytes)
+                exit_code = api.exec_inspect(exec_id)["ExitCode"]
+            return {
+                "status": "success",
+                "output": output,
+                "exit_code": exit_code
+            }
+        except Exception as e:
+            logger.error(f"Command execution failed: {e}")
+            return {
+                "status": "error",
+                "message": f"Command execution failed: {str(e)}"
+            }
+
+    def execute_batch(self, commands: List[str]) -> Dict[str, Any]:
+        """
+        Execute several commands in the VM with a single API round-trip.
+        
+        The commands are joined into one shell script that echoes a marker with
+        each command's exit code, so per-command results can be recovered from
+        the combined output. Each command is run through eval so its own
+        syntax (here-documents, trailing operators) cannot reach the marker
+        lines, while all commands still share one shell and working directory.
+        Execution stops at the first failing command.
+        
+        Args:
+            commands: The commands to execute, in order
+            
+        Returns:
+            Dict containing status, per-command results and the last exit code
+        """
+        for command in commands:
+            if self._disallowed_base(command) is not None:
+                return {
+                    "status": "error",
+                    "message": f"Command not allowed: {command}"
+                }
+        
+        marker = f"__VM_BATCH_{uuid.uuid4().hex}__"
+        script = ["exec 2>&1"]
+        for command in commands:
+            script.append(f"eval {shlex.quote(command)}")
+            script.append(f'__rc=$?; echo "{marker} $__rc"; [ $__rc -eq 0 ] || exit $__rc')
+        
+        result = self._run_command("\n".join(script))
+        if result["status"] != "success":
+            return result
+        
+        output = result["output"]
+        results = []
+        position = 0
+        for match in re.finditer(rf"{marker} (-?\d+)\n", output):
+            results.append({
+                "command": commands[len(results)],
+                "output": output[position:match.start()],
+                "exit_code": int(match.group(1))
+            })
+            position = match.end()
+        
+        # Trailing output belongs to a command that exited the shell (e.g. on a
+        # syntax error) without reaching its marker; commands after a failure
+        # never ran at all
+        reported = len(results)
+        for command in commands[reported:]:
+            results.append({"command": command, "output": "", "exit_code": None})
+        if reported < len(commands) and (reported == 0 or results[reported - 1]["exit_code"] == 0):
+            results[reported]["exit_code"] = result["exit_code"]
+        if position < len(output):
+            results[min(reported, len(results) - 1)]["output"] += output[position:]
+        
+        return {
+            "status": "success",
+            "results": results,
+            "exit_code": result["exit_code"]
+        }
+
+    def _open_host(self, file_path: str, flags: int, create_dirs: bool = False) -> int:
+        """
+        Open a file in the bind-mounted host workspace without following symlinks.
+        
+        Paths are resolved relative to /workspace like the VM API does, and may
+        not escape it. The VM can create symlinks, and swap them in at any
+        time, so the path is walked one component at a time from a descriptor
+        of the workspace root with O_NOFOLLOW rather than resolved as a string.
+        
+        Args:
+            file_path: Path to the file in the VM
+            flags: os.open flags for the file itself
+            create_dirs: Create missing parent directories, world-writable so
+                the VM's user can add files under them
+            
+        Returns:
+            File descriptor of the opened file
+        """
+        root = self.workspace_host
+        target = os.path.normpath(os.path.join(root, file_path.lstrip("/")))
+        if not target.startswith(root + os.sep):
+            raise ValueError(f"Path escapes the workspace: {file_path}")
+        *parents, name = os.path.relpath(target, root).split(os.sep)
+        
+        dir_fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for part in parents:
+                created = False
+                if create_dirs:
+                    try:
+                        os.mkdir(part, 0o777, dir_fd=dir_fd)
+                        created = True
+                    except FileExistsError:
+                        pass
+                child_fd = os.open(part, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=dir_fd)
+                os.close(dir_fd)
+                dir_fd = child_fd
+                if created:
+                    os.fchmod(dir_fd, 0o777)
+            return os.open(name, flags | os.O_NOFOLLOW, 0o666, dir_fd=dir_fd)
+        finally:
+            os.close(dir_fd)
+
     def write_file(self, file_path: str, content: str) -> Dict[str, str]:
         """
         Write content to a file in the VM.
@@ -304,15 +938,44 @@ class VMController:
         Returns:
             Dict containing status and message
         """
-        try:
-            response = requests.post(
-                f"{self.vm_api_url}/write_file",
-                json={
-                    "path": file_path,
-                    "content": content
+        self._exec_cache.clear()
+        
+        if self.workspace_host:
+            try:
+                # O_NONBLOCK keeps a FIFO planted by the VM from blocking the open
+                fd = self._open_host(
+                    file_path, os.O_WRONLY | os.O_CREAT | os.O_NONBLOCK, create_dirs=True
+                )
+                with os.fdopen(fd, "w") as f:
+                    if not stat.S_ISREG(os.fstat(fd).st_mode):
+                        raise ValueError(f"Not a regular file: {file_path}")
+                    os.ftruncate(fd, 0)
+                    # Keep files the controller creates editable by the VM's user
+                    if os.fstat(fd).st_uid == os.geteuid():
+                        os.fchmod(fd, 0o666)
+                    f.write(content)
+                return {"status": "success"}
+            except Exception as e:
+                logger.error(f"Failed to write file: {e}")
+                return {
+                    "status": "error",
+                    "message": f"Failed to write file: {str(e)}"
                 }
+        
+        try:
+            # Raw upload: the content is sent as-is rather than escaped into JSON
+            response = self._session.post(
+                f"{self.vm_api_url}/upload",
+                params={"path": file_path},
+                data=content.encode("utf-8"),
+                headers=_OCTET_STREAM_HEADERS,
+                timeout=self._timeout
             )
-            return response.json()
+            result = _loads(response.content)
+            if response.status_code != 200:
+                detail = result.get("detail", response.reason)
+                return {"status": "error", "message": f"Failed to write file: {detail}"}
+            return result
         except Exception as e:
             logger.error(f"Failed to write file: {e}")
             return {
@@ -330,12 +993,64 @@ class VMController:
         Returns:
             Dict containing status, content, and message
         """
+        if self.workspace_host:
+            try:
+                # O_NONBLOCK keeps a FIFO planted by the VM from blocking the open
+                fd = self._open_host(file_path, os.O_RDONLY | os.O_NONBLOCK)
+                with os.fdopen(fd, "rb") as f:
+                    info = os.fstat(fd)
+                    if not stat.S_ISREG(info.st_mode):
+                        raise ValueError(f"Not a regular file: {file_path}")
+                    if info.st_size > self.max_read_bytes:
+                        return {
+                            "status": "error",
+                            "message": f"File exceeds the {self.max_read_bytes} byte read limit"
+                        }
+                    # The file may grow after fstat; never read past the limit
+                    data = f.read(self.max_read_bytes + 1)
+                if len(data) > self.max_read_bytes:
+                    return {
+                        "status": "error",
+                        "message": f"File exceeds the {self.max_read_bytes} byte read limit"
+                    }
+                return {"status": "success", "content": data.decode("utf-8", errors="replace")}
+            except Exception as e:
+                logger.error(f"Failed to read file: {e}")
+                return {
+                    "status": "error",
+                    "message": f"Failed to read file: {str(e)}"
+                }
+        
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.vm_api_url}/read_file",
-                params={"path": file_path}
+                params={"path": file_path},
+                stream=True,
+                timeout=self._timeout
             )
-            return response.json()
+            with response:
+                if response.status_code != 200:
+                    detail = _loads(response.content).get("detail", response.reason)
+                    return {"status": "error", "message": f"Failed to read file: {detail}"}
+                
+                too_large = {
+                    "status": "error",
+                    "message": f"File exceeds the {self.max_read_bytes} byte read limit"
+                }
+                if int(response.headers.get("Content-Length", 0)) > self.max_read_bytes:
+                    return too_large
+                
+                # Decode as the body streams in, never holding more than one chunk of bytes
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                parts = []
+                size = 0
+                for chunk in response.iter_content(_STREAM_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_read_bytes:
+                        return too_large
+                    parts.append(decoder.decode(chunk))
+                parts.append(decoder.decode(b"", final=True))
+            return {"status": "success", "content": "".join(parts)}
         except Exception as e:
             logger.error(f"Failed to read file: {e}")
             return {
@@ -343,6 +1058,60 @@ class VMController:
                 "message": f"Failed to read file: {str(e)}"
             }
 
+    def batch(self, ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run several VM operations with a single API round-trip.
+        
+        Args:
+            ops: Operations in tool format, each with an "action" of execute,
+                write_file, read_file or install plus that action's parameters
+            
+        Returns:
+            Dict containing status and one result per operation
+        """
+        self._exec_cache.clear()
+        
+        api_ops = []
+        for op in ops:
+            if not isinstance(op, dict):
+                return {"status": "error", "message": f"Batch operation is not an object: {op!r}"}
+            action = op.get("action")
+            fields = _BATCH_FIELDS.get(action) if isinstance(action, str) else None
+            if fields is None:
+                return {"status": "error", "message": f"Unsupported batch action: {action}"}
+            for param in fields:
+                if param in op and not isinstance(op[param], str):
+                    return {"status": "error", "message": f"Invalid {action} op: {param} must be a string"}
+            if action == "install" and not _PACKAGE_RE.fullmatch(op.get("package", "")):
+                return {"status": "error", "message": f"Invalid package name: {op.get('package')}"}
+            if action == "execute" and self._disallowed_base(op.get("command", "")) is not None:
+                return {"status": "error", "message": f"Command not allowed: {op.get('command')}"}
+            api_op = {"op": action}
+            for param, field in fields.items():
+                if param in op:
+                    api_op[field] = op[param]
+            api_ops.append(api_op)
+        
+        try:
+            response = self._session.post(
+                f"{self.vm_api_url}/batch",
+                data=_dumps({"ops": api_ops}),
+                headers=_JSON_HEADERS,
+                timeout=self._timeout
+            )
+            if response.status_code != 200:
+                return {"status": "error", "message": _error_detail(response)}
+            return {
+                "status": "success",
+                "results": _loads(response.content).get("results", [])
+            }
+        except Exception as e:
+            logger.error(f"Batch execution failed: {e}")
+            return {
+                "status": "error",
+                "message": f"Batch execution failed: {str(e)}"
+            }
+
     def install_package(self, package_name: str) -> Dict[str, Any]:
         """
         Install a Python package in the VM.
@@ -353,12 +1122,30 @@ class VMController:
         Returns:
             Dict containing status and message
         """
+        self._exec_cache.clear()
+        
+        if not _PACKAGE_RE.fullmatch(package_name):
+            return {
+                "status": "error",
+                "message": f"Invalid package name: {package_name}"
+            }
+        
+        if self.exec_mode != "api":
+            return self._exec_direct([
+                "pip", "install", "--user", "--prefer-binary",
+                "--disable-pip-version-check", "--no-input", package_name
+            ])
+        
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.vm_api_url}/install",
-                json={"package": package_name}
+                data=_dumps({"package": package_name}),
+                headers=_JSON_HEADERS,
+                timeout=self._timeout
             )
-            return response.json()
+            if response.status_code != 200:
+                return {"status": "error", "message": _error_detail(response)}
+            return _loads(response.content)
         except Exception as e:
             logger.error(f"Failed to install package: {e}")
             return {
@@ -366,6 +1153,103 @@ class VMController:
                 "message": f"Failed to install package: {str(e)}"
             }
 
+# Controllers are cached per session so consecutive requests reuse the same
+# Docker client and container reference instead of rebuilding them each time.
+_controllers: Dict[str, VMController] = {}
+_controllers_lock = threading.Lock()
+
+def _session_key(session_id: Optional[str]) -> str:
+    """Return the session a request belongs to, falling back to the process default."""
+    return session_id or os.getenv('OPENWEBUI_SESSION_ID', 'default')
+
+def _get_controller(session_id: Optional[str]) -> VMController:
+    """Return the cached controller for a session, creating it on first use."""
+    session_id = _session_key(session_id)
+    with _controllers_lock:
+        controller = _controllers.get(session_id)
+        if controller is None:
+            controller = VMController(session_id=session_id)
+            _controllers[session_id] = controller
+        return controller
+
+@atexit.register
+def _stop_all_vms() -> None:
+    """Stop every VM started by this process on interpreter exit."""
+    for controller in list(_controllers.values()):
+        if controller.container is not None:
+            controller.stop_vm()
+    _controllers.clear()
+
+def _handle_start(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    # A controller that already holds a running container skips the daemon round-trip
+    if controller.container is not None:
+        return {
+            "status": "success",
+            "container_id": controller.container_id,
+            "message": "VM already running"
+        }
+    return controller.start_vm()
+
+def _handle_stop(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    result = controller.stop_vm()
+    if result["status"] == "success":
+        # The session is over; don't keep its controller around
+        with _controllers_lock:
+            if _controllers.get(controller.session_id) is controller:
+                del _controllers[controller.session_id]
+    return result
+
+def _handle_execute(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    command = request_data.get("command")
+    if not command:
+        return {"status": "error", "message": "No command provided"}
+    return controller.execute_command(command)
+
+def _handle_execute_batch(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    commands = request_data.get("commands")
+    if not commands:
+        return {"status": "error", "message": "No commands provided"}
+    return controller.execute_batch(commands)
+
+def _handle_write_file(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    file_path = request_data.get("file_path")
+    content = request_data.get("content")
+    if not file_path or content is None:
+        return {"status": "error", "message": "File path or content missing"}
+    return controller.write_file(file_path, content)
+
+def _handle_read_file(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    file_path = request_data.get("file_path")
+    if not file_path:
+        return {"status": "error", "message": "File path missing"}
+    return controller.read_file(file_path)
+
+def _handle_install(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    package = request_data.get("package")
+    if not package:
+        return {"status": "error", "message": "Package name missing"}
+    return controller.install_package(package)
+
+def _handle_batch(controller: VMController, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    ops = request_data.get("ops")
+    if not ops:
+        return {"status": "error", "message": "No operations provided"}
+    if not isinstance(ops, list):
+        return {"status": "error", "message": "Operations must be a list"}
+    return controller.batch(ops)
+
+# Action name -> handler taking (controller, request_data)
+_ACTION_HANDLERS = {
+    "start": _handle_start,
+    "stop": _handle_stop,
+    "execute": _handle_execute,
+    "execute_batch": _handle_execute_batch,
+    "write_file": _handle_write_file,
+    "read_file": _handle_read_file,
+    "install": _handle_install,
+    "batch": _handle_batch,
+}
+
 def handle_vm_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Handle requests from OpenWebUI to the VM controller.
@@ -377,43 +1261,62 @@ def handle_vm_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
         Dict containing response data
     """
     action = request_data.get("action")
+    handler = _ACTION_HANDLERS.get(action)
+    if handler is None:
+        return {"status": "error", "message": f"Unknown action: {action}"}
     
-    # Create controller instance
-    controller = VMController()
+    session_id = _session_key(request_data.get("session_id"))
+    if not _valid_session_id(session_id):
+        return {"status": "error", "message": f"Invalid session id: {session_id!r}"}
     
-    if action == "start":
-        return controller.start_vm()
+    # Reuse the session's controller instead of creating one per request
+    controller = _get_controller(session_id)
+    return handler(controller, request_data)
+
+async def handle_vm_request_async(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Awaitable variant of handle_vm_request for async OpenWebUI tools.
     
-    elif action == "stop":
-        return controller.stop_vm()
+    The blocking Docker and HTTP calls run in the default executor so the
+    caller's event loop keeps serving other sessions meanwhile.
     
-    elif action == "execute":
-        command = request_data.get("command")
-        if not command:
-            return {"status": "error", "message": "No command provided"}
-        return controller.execute_command(command)
+    Args:
+        request_data: Dictionary containing request parameters
+        
+    Returns:
+        Dict containing response data
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, handle_vm_request, request_data)
+
+async def handle_vm_requests_async(requests_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Handle many OpenWebUI requests concurrently.
     
-    elif action == "write_file":
-        file_path = request_data.get("file_path")
-        content = request_data.get("content")
-        if not file_path or content is None:
-            return {"status": "error", "message": "File path or content missing"}
-        return controller.write_file(file_path, content)
+    Requests for different sessions run in parallel, while requests sharing a
+    session run in their original order so e.g. a start always precedes the
+    commands that follow it.
     
-    elif action == "read_file":
-        file_path = request_data.get("file_path")
-        if not file_path:
-            return {"status": "error", "message": "File path missing"}
-        return controller.read_file(file_path)
+    Args:
+        requests_data: List of request dictionaries
+        
+    Returns:
+        List of response dictionaries, in the same order as the requests
+    """
+    # Grouped by the session that will actually serve each request, so a
+    # missing session_id and an explicit default share one ordered queue
+    by_session: Dict[str, List[int]] = {}
+    for index, request_data in enumerate(requests_data):
+        by_session.setdefault(_session_key(request_data.get("session_id")), []).append(index)
     
-    elif action == "install":
-        package = request_data.get("package")
-        if not package:
-            return {"status": "error", "message": "Package name missing"}
-        return controller.install_package(package)
+    results: List[Dict[str, Any]] = [{} for _ in requests_data]
     
-    else:
-        return {"status": "error", "message": f"Unknown action: {action}"}
+    async def run_session(indexes: List[int]) -> None:
+        for index in indexes:
+            results[index] = await handle_vm_request_async(requests_data[index])
+    
+    await asyncio.gather(*(run_session(indexes) for indexes in by_session.values()))
+    return results
 
 # Example usage
 if __name__ == "__main__":
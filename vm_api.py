@@ -2,13 +2,141 @@
 VM API Server - Handles communication between OpenWebUI and the VM
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
-from pydantic import BaseModel
-import subprocess
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List
+import asyncio
+import re
+import codecs
+import importlib.metadata
+import site
+import sys
 import os
+import signal
 
-app = FastAPI()
+# orjson serializes large outputs and file contents several times faster
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+app = FastAPI(default_response_class=DefaultResponse)
+
+WORKSPACE = "/workspace"
+
+# Directories known to exist, so warm writes skip os.makedirs' per-component stats
+known_dirs = {WORKSPACE}
+
+# Command output beyond this many bytes is dropped instead of buffered
+MAX_OUTPUT_BYTES = int(os.getenv("MAX_OUTPUT_BYTES", str(8 * 1024 * 1024)))
+READ_CHUNK_SIZE = 64 * 1024
+
+# Server-side limits, so a runaway command cannot hold a worker indefinitely
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "3600"))
+INSTALL_TIMEOUT = float(os.getenv("INSTALL_TIMEOUT", "600"))
+# How long to wait for a killed command's output pipe to close
+REAP_TIMEOUT = 5.0
+
+# Largest file returned inline as JSON; bigger files must be streamed via read_file
+MAX_TEXT_FILE_BYTES = int(os.getenv("MAX_TEXT_FILE_BYTES", str(8 * 1024 * 1024)))
+
+# Commands containing any of these need a shell; others are exec'd directly
+SHELL_METACHARS = frozenset("|&;<>()$`\\\"'*?[]{}~#=!\n")
+SHELL_BUILTINS = frozenset({
+    "cd", "export", "unset", "set", "source", ".", "alias", "unalias", "exec",
+    "eval", "exit", "read", "ulimit", "umask", "wait", "command", "type", "hash",
+    "trap", "getopts", "readonly", "local", "shift", "return", "break",
+    "continue", ":", "times", "let", "declare", "typeset", "builtin", "jobs",
+    "bg", "fg", "disown", "shopt", "pushd", "popd", "dirs"
+})
+
+# Package names, optionally pinned to an exact version (e.g. "numpy==1.26.4")
+PACKAGE_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._\-]*(?:==[A-Za-z0-9._\-]+)?")
+
+async def run_capped(command, cwd=None, timeout=None):
+    """
+    Run a command without blocking the event loop, decoding its combined
+    output incrementally up to MAX_OUTPUT_BYTES.
+    
+    A string command runs through the shell; a list is executed directly.
+    If it outlives `timeout` seconds, its whole process group is killed and
+    asyncio.TimeoutError is raised.
+    """
+    if isinstance(command, str):
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=cwd,
+            start_new_session=True
+        )
+    else:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=cwd,
+                start_new_session=True
+            )
+        except FileNotFoundError:
+            # Not a program on PATH; it may still be a shell builtin or
+            # function, so let the shell resolve it (and report 127 if not)
+            return await run_capped(" ".join(command), cwd, timeout)
+        except PermissionError:
+            return f"{command[0]}: Permission denied\n", 126
+    try:
+        return await asyncio.wait_for(collect_output(process), timeout)
+    except asyncio.TimeoutError:
+        # The process leads its own session, so this also reaps shell children
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await reap(process)
+        raise
+
+async def reap(process):
+    """Drain and wait for a killed process, giving up after REAP_TIMEOUT."""
+    # Until the pipe reaches EOF its transport stays paused on a full buffer
+    # and wait() never returns, so drain what the group left behind
+    async def drain_and_wait():
+        while await process.stdout.read(READ_CHUNK_SIZE):
+            pass
+        await process.wait()
+    try:
+        await asyncio.wait_for(drain_and_wait(), REAP_TIMEOUT)
+    except asyncio.TimeoutError:
+        # A descendant that left the process group still holds the pipe open;
+        # close our end instead of waiting for it to exit
+        process._transport.close()
+
+async def collect_output(process):
+    """Read a process's output until it exits, keeping at most MAX_OUTPUT_BYTES."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    remaining = MAX_OUTPUT_BYTES
+    truncated = False
+    # Keep draining past the cap so the child never blocks on a full pipe
+    while True:
+        chunk = await process.stdout.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        kept = chunk[:remaining]
+        if kept:
+            remaining -= len(kept)
+            parts.append(decoder.decode(kept))
+        if len(kept) < len(chunk):
+            truncated = True
+    parts.append(decoder.decode(b"", final=True))
+    returncode = await process.wait()
+    if truncated:
+        parts.append("\n[output truncated]")
+    return "".join(parts), returncode
 
 class CommandRequest(BaseModel):
     command: str
@@ -20,6 +148,26 @@ class FileRequest(BaseModel):
 class PackageRequest(BaseModel):
     package: str
 
+class BatchRequest(BaseModel):
+    ops: List[Dict[str, Any]]
+
+def command_argv(command):
+    """Split a command into argv when it needs no shell features, else return it unchanged."""
+    if any(ch in SHELL_METACHARS for ch in command):
+        return command
+    argv = command.split()
+    if not argv or argv[0] in SHELL_BUILTINS:
+        return command
+    return argv
+
+def installed_version(package):
+    """Return the installed version of a distribution, or None if it is missing."""
+    # The user site only joins sys.path at startup if it already existed then
+    path = sys.path + [site.getusersitepackages()]
+    for dist in importlib.metadata.distributions(name=package, path=path):
+        return dist.version
+    return None
+
 @app.get("/api/v1/health")
 async def health_check():
     return {"status": "healthy"}
@@ -27,57 +175,166 @@ async def health_check():
 @app.post("/api/v1/execute")
 async def execute_command(request: CommandRequest):
     try:
-        process = subprocess.run(
-            request.command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            cwd="/workspace"
+        # Plain commands skip the /bin/sh fork; pipes, redirects and the like keep it
+        output, exit_code = await run_capped(
+            command_argv(request.command),
+            cwd=WORKSPACE,
+            timeout=COMMAND_TIMEOUT
         )
         return {
-            "output": process.stdout + process.stderr,
-            "exit_code": process.returncode
+            "output": output,
+            "exit_code": exit_code
         }
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Command timed out after {COMMAND_TIMEOUT:g}s")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def workspace_path(path):
+    """Resolve a request path inside the workspace, rejecting paths that escape it."""
+    full = os.path.normpath(os.path.join(WORKSPACE, path.lstrip("/")))
+    if not full.startswith(WORKSPACE + "/"):
+        raise HTTPException(status_code=400, detail=f"Path escapes the workspace: {path}")
+    return full
+
+def ensure_parent(path):
+    directory = os.path.dirname(path)
+    if directory not in known_dirs:
+        os.makedirs(directory, exist_ok=True)
+        known_dirs.add(directory)
+
+def open_for_write(path, mode):
+    ensure_parent(path)
+    try:
+        return open(path, mode)
+    except FileNotFoundError:
+        # The cached directory has since been removed; recreate it
+        known_dirs.discard(os.path.dirname(path))
+        ensure_parent(path)
+        return open(path, mode)
+
+def write_text(path, content):
+    with open_for_write(path, "w") as f:
+        f.write(content)
+
+def read_text(path):
+    with open(path, "r") as f:
+        return f.read()
+
 @app.post("/api/v1/write_file")
 async def write_file(request: FileRequest):
+    path = workspace_path(request.path)
     try:
-        path = os.path.join("/workspace", request.path.lstrip("/"))
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w") as f:
-            f.write(request.content)
+        # Blocking file I/O runs in the threadpool so other requests keep flowing
+        await run_in_threadpool(write_text, path, request.content)
+        return {"status": "success"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/upload")
+async def upload_file(path: str, request: Request):
+    """Write a raw request body to a file chunk by chunk, without buffering it whole."""
+    path = workspace_path(path)
+    try:
+        f = await run_in_threadpool(open_for_write, path, "wb")
+        try:
+            async for chunk in request.stream():
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/read_file")
 async def read_file(path: str):
+    # Streamed straight from disk instead of being decoded and wrapped in JSON
+    path = workspace_path(path)
+    if not await run_in_threadpool(os.path.isfile, path):
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    return FileResponse(path, media_type="application/octet-stream")
+
+@app.get("/api/v1/read_text_file")
+async def read_text_file(path: str):
+    """Return a text file's content wrapped in JSON, for callers that need it inline."""
+    path = workspace_path(path)
+    try:
+        size = await run_in_threadpool(os.path.getsize, path)
+    except OSError:
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    if size > MAX_TEXT_FILE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds {MAX_TEXT_FILE_BYTES} bytes; use /api/v1/read_file"
+        )
     try:
-        path = os.path.join("/workspace", path.lstrip("/"))
-        with open(path, "r") as f:
-            content = f.read()
+        content = await run_in_threadpool(read_text, path)
         return {"content": content}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/install")
 async def install_package(request: PackageRequest):
+    # Only plain names reach pip, never options or requirement files
+    if not PACKAGE_RE.fullmatch(request.package):
+        raise HTTPException(status_code=400, detail=f"Invalid package name: {request.package}")
     try:
-        process = subprocess.run(
-            f"pip install --user {request.package}",
-            shell=True,
-            capture_output=True,
-            text=True
-        )
+        # Packages baked into the image are the common case; skip the resolver for them
+        name, _, version = request.package.partition("==")
+        current = await run_in_threadpool(installed_version, name)
+        if current is not None and (not version or current == version):
+            return {
+                "output": f"Requirement already satisfied: {name}=={current}",
+                "exit_code": 0
+            }
+        
+        output, exit_code = await run_capped([
+            "pip", "install", "--user", "--prefer-binary",
+            "--disable-pip-version-check", "--no-input", request.package
+        ], timeout=INSTALL_TIMEOUT)
         return {
-            "output": process.stdout + process.stderr,
-            "exit_code": process.returncode
+            "output": output,
+            "exit_code": exit_code
         }
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Install timed out after {INSTALL_TIMEOUT:g}s")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch op name -> (request model, handler); read_file takes its path directly
+# and returns JSON via read_text_file, since batch results are JSON
+BATCH_HANDLERS = {
+    "execute": (CommandRequest, execute_command),
+    "write_file": (FileRequest, write_file),
+    "install": (PackageRequest, install_package),
+}
+
+@app.post("/api/v1/batch")
+async def batch(request: BatchRequest):
+    """Run several operations in order with one request, reporting each result."""
+    results = []
+    for op in request.ops:
+        name = op.get("op")
+        try:
+            if name == "read_file":
+                path = op.get("path")
+                if isinstance(path, str):
+                    result = await read_text_file(path)
+                else:
+                    result = {"status": "error", "message": "Invalid read_file op: path must be a string"}
+            elif isinstance(name, str) and name in BATCH_HANDLERS:
+                model, handler = BATCH_HANDLERS[name]
+                fields = {key: value for key, value in op.items() if key != "op"}
+                result = await handler(model(**fields))
+            else:
+                result = {"status": "error", "message": f"Unknown op: {name}"}
+        except HTTPException as e:
+            result = {"status": "error", "message": e.detail}
+        except (KeyError, ValidationError) as e:
+            result = {"status": "error", "message": f"Invalid {name} op: {e}"}
+        results.append(result)
+    return {"results": results}
+
 @app.post("/api/v1/shutdown")
 async def shutdown():
     return {"status": "shutting down"}